@@ -1,23 +1,158 @@
-from flask import Flask, render_template, request, jsonify, Response
-import json
 import time
+
+# Measure how long importing the app takes (reported by /health)
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, Response, send_from_directory, url_for
+from werkzeug.middleware.proxy_fix import ProxyFix
+import json
+import math
+import itertools
+import mimetypes
+import os
+import random
 import threading
 from datetime import datetime
-from supabase import create_client, Client
 from config import SUPABASE_URL, SUPABASE_KEY
+from leaderboard import Leaderboard, player_stat_values, stat_change_deltas
+from game_clock import ClockScheduler, GameClock
+
+# Optional WebSocket transport for scorekeepers (binary MessagePack frames)
+try:
+    from flask_sock import Sock
+    import msgpack
+except ImportError:
+    Sock = None
+    msgpack = None
 
 app = Flask(__name__)
 
+# Number of reverse proxies in front of the app (nginx by default). Only the
+# X-Forwarded-For entries they added are trusted for the client address;
+# set to 0 when gunicorn is exposed directly.
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 1))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
 # Global variable to store connected SSE clients
 sse_clients = []
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase client initialized successfully")
-except Exception as e:
-    print(f"❌ Error initializing Supabase client: {e}")
-    supabase = None
+# Global variable to store connected scorekeeper WebSocket clients
+ws_clients = []
+
+# SSE reconnect and shutdown tuning (per worker)
+SSE_RETRY_BASE_MS = int(os.getenv('SSE_RETRY_BASE_MS', 2000))
+SSE_RETRY_JITTER_MS = int(os.getenv('SSE_RETRY_JITTER_MS', 8000))
+SSE_DRAIN_WINDOW = float(os.getenv('SSE_DRAIN_WINDOW', 20))  # Keep below gunicorn's graceful_timeout
+SSE_ADMIT_RATE = float(os.getenv('SSE_ADMIT_RATE', 20))  # New connections per second
+SSE_ADMIT_BURST = int(os.getenv('SSE_ADMIT_BURST', 40))
+
+# Queue sentinel telling an SSE stream to say goodbye and close
+SSE_SHUTDOWN = None
+sse_draining = threading.Event()
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `burst`"""
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; returns False instead of blocking"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+    
+    def available(self):
+        """Tokens available right now, including the refill since the last acquire"""
+        with self.lock:
+            return min(self.capacity, self.tokens + (time.monotonic() - self.updated) * self.rate)
+    
+    def retry_after(self, tokens=1):
+        """Seconds until `tokens` will be available"""
+        with self.lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+sse_admission = TokenBucket(SSE_ADMIT_RATE, SSE_ADMIT_BURST)
+
+# Admission control for the mutation endpoints, per game and per client
+GAME_WRITE_RATE = float(os.getenv('GAME_WRITE_RATE', 20))
+GAME_WRITE_BURST = int(os.getenv('GAME_WRITE_BURST', 40))
+CLIENT_WRITE_RATE = float(os.getenv('CLIENT_WRITE_RATE', 8))
+CLIENT_WRITE_BURST = int(os.getenv('CLIENT_WRITE_BURST', 16))
+MAX_INFLIGHT_WRITES = int(os.getenv('MAX_INFLIGHT_WRITES', 4))  # Per game, before shedding
+MAX_TRACKED_CLIENTS = 10000
+admission_lock = threading.Lock()
+game_write_buckets = {}
+client_write_buckets = {}
+game_inflight_writes = {}
+admission_stats = {}
+# Games known to be active in this worker; writes to other ids are refused
+# before any per-game admission state is created for them
+active_game_ids = set()
+
+if Sock is not None:
+    # Let the server ping idle scorekeepers so proxies keep the socket open
+    app.config['SOCK_SERVER_OPTIONS'] = {'ping_interval': 25}
+    sock = Sock(app)
+    print("✅ Scorekeeper WebSocket transport enabled")
+else:
+    sock = None
+
+# Supabase client, created lazily per process (a client built before
+# gunicorn forks must not be shared between workers)
+supabase = None
+backend_init_attempted = False
+backend_init_lock = threading.Lock()
+
+# Startup state reported by /health and /ready
+startup_timings = {}
+warm_up_done = threading.Event()
+
+def init_supabase():
+    """Create the Supabase client on first use in this process"""
+    global supabase, backend_init_attempted
+    if backend_init_attempted:
+        return supabase
+    
+    with backend_init_lock:
+        if backend_init_attempted:
+            return supabase
+        
+        started = time.perf_counter()
+        try:
+            # Deferred: the supabase package is slow to import
+            from supabase import create_client
+            supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+            print("✅ Supabase client initialized successfully")
+        except Exception as e:
+            print(f"❌ Error initializing Supabase client: {e}")
+            supabase = None
+        startup_timings['backend_init_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        backend_init_attempted = True
+    
+    return supabase
+
+@app.before_request
+def ensure_backend():
+    """Initialize the backend on first use; probes never wait on it"""
+    if request.endpoint in ('health', 'ready', 'metrics'):
+        return
+    init_supabase()
 
 # In-memory storage for demo purposes (fallback if Supabase is not available)
 # In a real app, you'd use a database
@@ -28,6 +163,8 @@ sports_buddies = [
         "age": 12,
         "sport": "basketball",
         "location": "Central Park",
+        "latitude": 40.7829,
+        "longitude": -73.9654,
         "availability": "Weekends",
         "skill_level": "intermediate",
         "created_at": "2024-01-15"
@@ -38,6 +175,8 @@ sports_buddies = [
         "age": 10,
         "sport": "soccer",
         "location": "Riverside Fields",
+        "latitude": 40.801,
+        "longitude": -73.972,
         "availability": "After school",
         "skill_level": "beginner",
         "created_at": "2024-01-14"
@@ -48,15 +187,166 @@ sports_buddies = [
         "age": 11,
         "sport": "tennis",
         "location": "Community Center",
+        "latitude": 40.758,
+        "longitude": -73.9855,
         "availability": "Weekdays",
         "skill_level": "advanced",
         "created_at": "2024-01-13"
     }
 ]
 
+# Spatial grid index over sports buddies: (row, col) cell -> buddies in that cell
+BUDDY_GRID_CELL_DEG = 0.02  # Roughly 2 km of latitude per cell
+KM_PER_DEGREE = 111.32
+EARTH_RADIUS_KM = 6371.0
+MAX_BUDDY_RADIUS_KM = 50
+MAX_BUDDY_LATITUDE = 85  # Grid cells get too narrow to scan efficiently nearer the poles
+BUDDY_GRID_COLUMNS = round(360 / BUDDY_GRID_CELL_DEG)  # Column indexes wrap at ±180° longitude
+buddy_grid = {}
+
+def valid_coordinates(lat, lng):
+    """Check that a coordinate pair is finite and inside the supported range"""
+    return (lat is not None and lng is not None
+            and math.isfinite(lat) and math.isfinite(lng)
+            and abs(lat) <= MAX_BUDDY_LATITUDE and abs(lng) <= 180)
+
+def valid_radius(radius_km):
+    """Check that a search radius is positive and no larger than the grid search supports"""
+    return radius_km is not None and 0 < radius_km <= MAX_BUDDY_RADIUS_KM
+
+def wrap_grid_column(col):
+    """Map a column index onto [-BUDDY_GRID_COLUMNS / 2, BUDDY_GRID_COLUMNS / 2)"""
+    half = BUDDY_GRID_COLUMNS // 2
+    return (col + half) % BUDDY_GRID_COLUMNS - half
+
+def buddy_grid_cell(lat, lng):
+    """Return the grid cell containing a coordinate"""
+    return (math.floor(lat / BUDDY_GRID_CELL_DEG), wrap_grid_column(math.floor(lng / BUDDY_GRID_CELL_DEG)))
+
+def index_buddy(buddy):
+    """Add a buddy with coordinates to the spatial grid index"""
+    if not valid_coordinates(buddy.get('latitude'), buddy.get('longitude')):
+        return
+    cell = buddy_grid_cell(buddy['latitude'], buddy['longitude'])
+    buddy_grid.setdefault(cell, []).append(buddy)
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def buddy_cell_km(lat, radius_km):
+    """Grid cell height and narrowest width in kilometres across a search band"""
+    height_km = BUDDY_GRID_CELL_DEG * KM_PER_DEGREE
+    band_edge = min(abs(lat) + radius_km / KM_PER_DEGREE, 89.0)
+    return height_km, height_km * math.cos(math.radians(band_edge))
+
+def buddy_matches(buddy, sport='', age_range='', skill_level=''):
+    """Check a buddy against the sport, age range and skill level filters"""
+    if sport and sport not in buddy['sport'].lower():
+        return False
+    if age_range:
+        min_age, max_age = map(int, age_range.split('-'))
+        if not min_age <= buddy['age'] <= max_age:
+            return False
+    if skill_level and buddy['skill_level'].lower() != skill_level:
+        return False
+    return True
+
+def buddies_in_band(row, col, rows, cols, inner_rows, inner_cols):
+    """Yield buddies within (rows, cols) cells of (row, col) but outside (inner_rows, inner_cols).
+
+    Columns wrap around the antimeridian. A scan never spans every column
+    (at most a few hundred at MAX_BUDDY_LATITUDE and MAX_BUDDY_RADIUS_KM), so
+    no cell is visited twice.
+    """
+    for r in range(row - rows, row + rows + 1):
+        if abs(r - row) > inner_rows:
+            columns = range(col - cols, col + cols + 1)
+        else:
+            # Rows already partly scanned: only the new columns on each side
+            columns = itertools.chain(range(col - cols, col - inner_cols),
+                                      range(col + inner_cols + 1, col + cols + 1))
+        for c in columns:
+            yield from buddy_grid.get((r, wrap_grid_column(c)), ())
+
+def find_buddies_near(lat, lng, radius_km=None, limit=None, **filters):
+    """Find matching buddies by distance using the grid index.
+
+    Scans rings of cells outwards from the query point, so the cost depends on
+    the search area rather than the size of the buddy pool. Stops once the
+    radius is covered or the nearest `limit` buddies are known for certain.
+    Callers reject radii above MAX_BUDDY_RADIUS_KM (see valid_radius).
+    """
+    radius_km = radius_km or MAX_BUDDY_RADIUS_KM
+    row, col = buddy_grid_cell(lat, lng)
+    height_km, width_km = buddy_cell_km(lat, radius_km)
+    max_ring = math.ceil(radius_km / height_km) + 1
+    
+    # Each ring widens the scanned rectangle by one cell height in km, using
+    # more columns than rows since cells are narrower than they are tall
+    matches = []
+    rows = cols = -1
+    for ring in range(max_ring + 1):
+        inner_rows, inner_cols = rows, cols
+        rows, cols = ring, math.ceil(ring * height_km / width_km)
+        for buddy in buddies_in_band(row, col, rows, cols, inner_rows, inner_cols):
+            if not buddy_matches(buddy, **filters):
+                continue
+            distance = haversine_km(lat, lng, buddy['latitude'], buddy['longitude'])
+            if distance <= radius_km:
+                matches.append({**buddy, 'distance_km': round(distance, 2)})
+        
+        # Everything closer than `ring` cell heights has now been visited
+        if limit and len(matches) >= limit:
+            matches.sort(key=lambda b: b['distance_km'])
+            if matches[limit - 1]['distance_km'] <= ring * height_km:
+                break
+    
+    matches.sort(key=lambda b: b['distance_km'])
+    return matches[:limit] if limit else matches
+
+for buddy in sports_buddies:
+    index_buddy(buddy)
+
 # Basketball games storage
 basketball_games = []
 
+# Finished games are compacted out of live_games by a background archiver
+ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 60))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 50))
+RECENT_ARCHIVED_GAMES = 20
+
+# Live "game leaders" per game id, and season leaders keyed by player name
+LEADERBOARD_SIZE = 5
+SEASON_SEED_PAGE_SIZE = 1000  # PostgREST caps rows per response, so seed queries are paged
+live_leaderboards = {}
+season_leaderboard = None
+season_leaderboard_lock = threading.Lock()
+
+# Game clocks per game id, all driven by one scheduler thread
+CLOCK_PERIOD_SECONDS = int(os.getenv('CLOCK_PERIOD_SECONDS', 8 * 60))
+CLOCK_SYNC_INTERVAL = int(os.getenv('CLOCK_SYNC_INTERVAL', 30))
+CLOCK_ACTIONS = ('start', 'pause', 'next_period')
+STAT_TYPES = ('points_2', 'points_3', 'assists', 'rebounds', 'steals')
+CLOCK_STATE_FIELDS = ('period', 'remaining_s', 'running', 'anchor_epoch')  # Stored as live_games.clock_<field>
+clock_scheduler = ClockScheduler()
+game_clocks = {}
+
+# Serializes starting a live game so concurrent requests cannot create several
+live_game_lock = threading.Lock()
+
+# Games being scored in this worker. Changes are applied to these copies and
+# saved to live_games afterwards, so the write path never reads the row back.
+# This assumes each game is scored through one worker (gunicorn runs one).
+game_states = {}
+game_write_locks = {}
+pending_game_saves = {}  # game id -> error callbacks of changes waiting for a background save
+game_state_lock = threading.Lock()
+
 # Live game data storage (fallback if Supabase is not available)
 default_live_game_data = {
     "team1": [
@@ -75,27 +365,57 @@ default_live_game_data = {
     ]
 }
 
+def live_game_from_row(row):
+    """Convert a live_games row into the game data shape used by the app"""
+    return {
+        "team1": row.get('team1_data', default_live_game_data['team1']),
+        "team2": row.get('team2_data', default_live_game_data['team2']),
+        "team1_name": row.get('team1_name', 'TEAM 1'),
+        "team2_name": row.get('team2_name', 'TEAM 2'),
+        "game_id": row.get('id'),
+        # Clock state saved by save_clock_state, if the clock was ever used
+        "clock_state": ({field: row[f'clock_{field}'] for field in CLOCK_STATE_FIELDS}
+                        if row.get('clock_period') is not None else None)
+    }
+
+def fetch_live_game():
+    """Most recent active game, or None if there is none (read-only; raises on backend errors)"""
+    # Finished games are left to the archiver
+    response = supabase.table('live_games').select('*').eq('status', 'active').order('created_at', desc=True).limit(1).execute()
+    if response.data:
+        game_key = str(response.data[0]['id'])
+        active_game_ids.add(game_key)
+        # Changes not saved yet are only in the in-memory copy
+        return game_states.get(game_key) or live_game_from_row(response.data[0])
+    return None
+
 def get_live_game_data():
-    """Get live game data from Supabase or return default data"""
+    """Get the active game from Supabase, or default data if there is none"""
     if supabase is None:
         return default_live_game_data
     
     try:
-        # Try to get the most recent live game
-        response = supabase.table('live_games').select('*').order('created_at', desc=True).limit(1).execute()
-        
-        if response.data:
-            game_data = response.data[0]
-            return {
-                "team1": game_data.get('team1_data', default_live_game_data['team1']),
-                "team2": game_data.get('team2_data', default_live_game_data['team2']),
-                "team1_name": game_data.get('team1_name', 'TEAM 1'),
-                "team2_name": game_data.get('team2_name', 'TEAM 2'),
-                "game_id": game_data.get('id')
-            }
-        else:
-            # Create a new game if none exists
-            return create_new_live_game()
+        return fetch_live_game() or default_live_game_data
+    except Exception as e:
+        print(f"Error fetching live game data: {e}")
+        return default_live_game_data
+
+def get_or_start_live_game():
+    """Get the active game, starting one only if none exists yet.
+
+    /end_game starts the next game itself, so this only creates a game on a
+    fresh database or after that failed. The lock and re-check keep
+    concurrent page loads from each inserting one.
+    """
+    if supabase is None:
+        return default_live_game_data
+    
+    try:
+        game_data = fetch_live_game()
+        if game_data is None:
+            with live_game_lock:
+                game_data = fetch_live_game() or create_new_live_game()
+        return game_data
     except Exception as e:
         print(f"Error fetching live game data: {e}")
         return default_live_game_data
@@ -117,44 +437,292 @@ def create_new_live_game():
         response = supabase.table('live_games').insert(new_game).execute()
         
         if response.data:
-            game_data = response.data[0]
-            return {
-                "team1": game_data['team1_data'],
-                "team2": game_data['team2_data'],
-                "team1_name": game_data['team1_name'],
-                "team2_name": game_data['team2_name'],
-                "game_id": game_data['id']
-            }
+            active_game_ids.add(str(response.data[0]['id']))
+            return live_game_from_row(response.data[0])
     except Exception as e:
         print(f"Error creating new live game: {e}")
     
     return default_live_game_data
 
-def update_live_game_data(game_id, team, player_index, stat_type, value):
-    """Update a specific stat in the live game"""
+def get_game_state(game_id):
+    """In-memory game data for an active game, loaded on first use; None if it is not active"""
+    game_key = str(game_id)
+    game_data = game_states.get(game_key)
+    if game_data is None:
+        fetched = fetch_active_game(game_id)
+        if fetched is None:
+            return None
+        # Another request may have loaded it meanwhile and already changed it
+        game_data = game_states.setdefault(game_key, fetched)
+    return game_data
+
+def game_write_lock(game_id):
+    """Lock ordering a game's saves, so an older snapshot never overwrites a newer one"""
+    with game_state_lock:
+        return game_write_locks.setdefault(str(game_id), threading.RLock())
+
+def save_game_state(game_id):
+    """Write a game's in-memory box score and team names to its row.
+
+    Returns an error message, or None once saved (or if the game has ended
+    and was already saved by /end_game).
+    """
+    with game_write_lock(game_id):
+        game_data = game_states.get(str(game_id))
+        if game_data is None:
+            return None
+        
+        update_data = {
+            'team1_data': [dict(player) for player in game_data['team1']],
+            'team2_data': [dict(player) for player in game_data['team2']],
+            'team1_name': game_data['team1_name'],
+            'team2_name': game_data['team2_name']
+        }
+        try:
+            response = supabase.table('live_games').update(update_data).eq('id', game_id).eq('status', 'active').execute()
+            if not response.data:
+                return 'Game not found or not active'
+        except Exception as e:
+            print(f"Error saving game {game_id}: {e}")
+            return 'Failed to save to database'
+    return None
+
+def queue_game_save(game_id, report_error):
+    """Save a game in the background; changes made while a save is queued share it"""
+    game_key = str(game_id)
+    with game_state_lock:
+        waiting = pending_game_saves.get(game_key)
+        if waiting is not None:
+            waiting.append(report_error)
+            return
+        pending_game_saves[game_key] = [report_error]
+    threading.Thread(target=run_game_save, args=(game_id,), name='game-save', daemon=True).start()
+
+def run_game_save(game_id):
+    """Background save queued by queue_game_save"""
+    with game_write_lock(game_id):
+        # Claimed only once the previous save is done, so changes made
+        # during it are folded into this one
+        with game_state_lock:
+            callbacks = pending_game_saves.pop(str(game_id), [])
+        error = save_game_state(game_id)
+    if error:
+        for report_error in callbacks:
+            report_error(error)
+
+def save_game_change(game_id, report_error):
+    """Save now and return any error, or, given report_error, save in the background"""
+    if report_error is None:
+        return save_game_state(game_id)
+    queue_game_save(game_id, report_error)
+    return None
+
+def valid_stat_change(game_data, team, player_index, stat_type, value):
+    """Check a stat change against the game's roster and the tracked stats"""
+    return (team in ('team1', 'team2') and isinstance(player_index, int)
+            and 0 <= player_index < len(game_data[team])
+            and stat_type in STAT_TYPES and value >= 0)
+
+def team_score(team_data):
+    """Total points scored by a team's players"""
+    return sum((player.get('points_2', 0) * 2) + (player.get('points_3', 0) * 3) for player in team_data or [])
+
+def end_live_game(game_id):
+    """Move an active game to 'finished' so the archiver can compact it"""
     if supabase is None:
         return False
     
     try:
-        # Get current game data
-        response = supabase.table('live_games').select('*').eq('id', game_id).execute()
+        response = supabase.table('live_games').update({
+            'status': 'finished',
+            'ended_at': datetime.now().isoformat()
+        }).eq('id', game_id).eq('status', 'active').execute()
+        return bool(response.data)
+    except Exception as e:
+        print(f"Error ending live game: {e}")
+    
+    return False
+
+def archive_finished_games(batch_size=ARCHIVE_BATCH_SIZE):
+    """Compact finished games into summary rows plus cold box scores.
+
+    Each finished game becomes one slim `game_summaries` row and one
+    `game_box_scores` row, then is removed from `live_games` so the hot
+    table only holds games that are still being played.
+    """
+    if supabase is None:
+        return 0
+    
+    archived = 0
+    try:
+        response = supabase.table('live_games').select('*').eq('status', 'finished').order('created_at').limit(batch_size).execute()
         
-        if response.data:
-            game_data = response.data[0]
-            team_data = game_data[f'{team}_data']
-            
-            # Update the specific stat
-            team_data[player_index][stat_type] = value
+        for game in response.data:
+            supabase.table('game_summaries').upsert({
+                'game_id': game['id'],
+                'team1_name': game.get('team1_name', 'TEAM 1'),
+                'team2_name': game.get('team2_name', 'TEAM 2'),
+                'team1_score': team_score(game.get('team1_data')),
+                'team2_score': team_score(game.get('team2_data')),
+                'played_at': game['created_at'],
+                'ended_at': game.get('ended_at') or game.get('updated_at')
+            }).execute()
             
-            # Update the database
-            update_data = {f'{team}_data': team_data}
-            supabase.table('live_games').update(update_data).eq('id', game_id).execute()
+            supabase.table('game_box_scores').upsert({
+                'game_id': game['id'],
+                'team1_data': game.get('team1_data', []),
+                'team2_data': game.get('team2_data', [])
+            }).execute()
             
-            return True
+            # Only drop the hot row once both archive rows are written
+            supabase.table('live_games').delete().eq('id', game['id']).eq('status', 'finished').execute()
+            archived += 1
     except Exception as e:
-        print(f"Error updating live game data: {e}")
+        print(f"Error archiving finished games: {e}")
     
-    return False
+    if archived:
+        print(f"🗄️ Archived {archived} finished games")
+    return archived
+
+archiver_thread = None
+
+def start_archiver(interval=ARCHIVE_INTERVAL):
+    """Start the background archiver thread once per process"""
+    global archiver_thread
+    if archiver_thread is not None or init_supabase() is None:
+        return
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            archive_finished_games()
+    
+    archiver_thread = threading.Thread(target=run, name='game-archiver', daemon=True)
+    archiver_thread.start()
+    print(f"🗄️ Game archiver running every {interval}s")
+
+# Fingerprinted assets written by build_assets.py
+ASSET_DIST_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_MAX_AGE = 365 * 24 * 3600
+asset_manifest = None
+
+def load_asset_manifest():
+    """Load the asset manifest once; empty when build_assets.py has not been run"""
+    global asset_manifest
+    if asset_manifest is None:
+        try:
+            with open(os.path.join(ASSET_DIST_DIR, 'manifest.json')) as f:
+                asset_manifest = json.load(f)
+        except (OSError, ValueError):
+            print("💡 No asset manifest found, serving unfingerprinted static files (run build_assets.py)")
+            asset_manifest = {}
+    return asset_manifest
+
+@app.template_global()
+def asset_url(name):
+    """URL for a static asset, fingerprinted when a build is available"""
+    built_name = load_asset_manifest().get(name)
+    if built_name:
+        return url_for('built_asset', filename=built_name)
+    return url_for('static', filename=name)
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Serve a fingerprinted asset, preferring a precompressed variant"""
+    mimetype = mimetypes.guess_type(filename)[0]
+    
+    # Variants that were built, in our order of preference; the client's
+    # q-values decide (so "gzip;q=0" is honoured, not matched as a substring)
+    suffixes = {'br': '.br', 'gzip': '.gz'}
+    available = [encoding for encoding, suffix in suffixes.items()
+                 if os.path.isfile(os.path.join(ASSET_DIST_DIR, filename + suffix))]
+    encoding = request.accept_encodings.best_match(available)
+    
+    if encoding:
+        response = send_from_directory(ASSET_DIST_DIR, filename + suffixes[encoding], mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(ASSET_DIST_DIR, filename, mimetype=mimetype)
+    
+    # File names change whenever content does, so browsers never need to revalidate
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def warm_up():
+    """Connect the backend, compile templates and load the active game, if any"""
+    started = time.perf_counter()
+    init_supabase()
+    
+    step = time.perf_counter()
+    load_asset_manifest()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    startup_timings['templates_ms'] = round((time.perf_counter() - step) * 1000, 1)
+    
+    step = time.perf_counter()
+    # Read-only: with no active game there is nothing to preload, and
+    # starting one is left to /live-game and /end_game
+    if supabase is not None:
+        try:
+            game_data = fetch_live_game()
+            if game_data is not None:
+                get_game_leaderboard(game_data)
+        except Exception as e:
+            print(f"Error preloading live game: {e}")
+    get_season_leaderboard()
+    startup_timings['preload_ms'] = round((time.perf_counter() - step) * 1000, 1)
+    
+    startup_timings['warm_up_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    warm_up_done.set()
+    print(f"🔥 Warm-up finished in {startup_timings['warm_up_ms']}ms")
+    
+    start_archiver()
+
+def init_worker_state():
+    """Recreate this process's locks, events and clock scheduler.
+
+    With preload_app the module is imported in the gunicorn master, before
+    gevent patches threading in each worker, so anything built at import time
+    is a real OS lock that can stall the whole worker when a greenlet yields
+    while holding it. Call this in the worker after patching and before any
+    request or background thread uses them.
+    """
+    global sse_draining, sse_admission, admission_lock, backend_init_lock
+    global warm_up_done, season_leaderboard_lock, clock_scheduler, live_game_lock, game_state_lock
+    sse_draining = threading.Event()
+    sse_admission = TokenBucket(SSE_ADMIT_RATE, SSE_ADMIT_BURST)
+    admission_lock = threading.Lock()
+    backend_init_lock = threading.Lock()
+    warm_up_done = threading.Event()
+    season_leaderboard_lock = threading.Lock()
+    clock_scheduler = ClockScheduler()
+    live_game_lock = threading.Lock()
+    game_state_lock = threading.Lock()
+
+def start_warm_up():
+    """Run warm-up in the background so the worker can boot without waiting on it"""
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+@app.route('/health')
+def health():
+    """Liveness check: the process is up and serving requests"""
+    return jsonify({
+        'status': 'ok',
+        'uptime_s': round(time.perf_counter() - IMPORT_STARTED, 1),
+        'startup': startup_timings
+    })
+
+@app.route('/ready')
+def ready():
+    """Readiness check: warm-up has finished and the backend client is available"""
+    is_ready = warm_up_done.is_set() and supabase is not None
+    body = {
+        'ready': is_ready,
+        'backend': 'connected' if supabase is not None else 'unavailable',
+        'startup': startup_timings
+    }
+    return jsonify(body), 200 if is_ready else 503
 
 @app.route('/')
 def index():
@@ -167,30 +735,49 @@ def jack():
 
 @app.route('/live-game')
 def live_game():
-    game_data = get_live_game_data()
-    return render_template('live_game.html', game_data=game_data)
+    game_data = get_or_start_live_game()
+    leaders = get_game_leaderboard(game_data).snapshot()
+    clock = get_game_clock(game_data).snapshot()
+    return render_template('live_game.html', game_data=game_data, leaders=leaders, clock=clock)
 
-@app.route('/update_player_stat', methods=['POST'])
-def update_player_stat():
-    data = request.json
-    team = data['team']
-    player_index = data['player_index']
-    stat_type = data['stat_type']
-    value = int(data['value'])
-    game_id = data.get('game_id')
-    
-    # Update in Supabase if available
+def apply_stat_update(team, player_index, stat_type, value, game_id, report_error=None):
+    """Apply a stat change, broadcast it and return the result payload.
+
+    The change is applied to the in-memory game. Without report_error it is
+    saved before returning; with it (the scorekeeper socket) it is saved in
+    the background and a failed save is passed to report_error.
+    """
     if supabase is not None and game_id:
-        update_success = update_live_game_data(game_id, team, player_index, stat_type, value)
-        if not update_success:
-            return jsonify({'success': False, 'error': 'Failed to update database'})
-    
-    # Get updated game data
-    game_data = get_live_game_data()
+        game_data = get_game_state(game_id)
+        if game_data is None:
+            return {'success': False, 'error': 'Game not found or not active'}
+        if not valid_stat_change(game_data, team, player_index, stat_type, value):
+            return {'success': False, 'error': 'Invalid stat update'}
+        
+        player = game_data[team][player_index]
+        previous_value = player.get(stat_type, 0)
+        player[stat_type] = value
+        error = save_game_change(game_id, report_error)
+        if error:
+            if player[stat_type] == value:
+                player[stat_type] = previous_value
+            return {'success': False, 'error': error}
+    else:
+        game_data = get_live_game_data()
+        previous_value = game_data[team][player_index][stat_type]
     
     # Calculate totals for the updated player
     player = game_data[team][player_index]
     total_points = (player['points_2'] * 2) + (player['points_3'] * 3)
+    team_totals = calculate_team_totals_from_data(game_data)
+    
+    # Stamp the change with game time for per-period splits
+    clock = game_clocks.get(str(game_id or game_data.get('game_id')))
+    if clock is None:
+        # Created by this change: its baseline is the box score before it
+        clock = get_game_clock(game_data)
+        clock.baseline[(team, player_index, stat_type)] = previous_value
+    game_time = clock.stamp(team, player_index, stat_type, value)
     
     # Broadcast the update to all connected clients
     broadcast_update('stat_update', {
@@ -199,93 +786,567 @@ def update_player_stat():
         'stat_type': stat_type,
         'value': value,
         'total_points': total_points,
-        'team_totals': calculate_team_totals_from_data(game_data)
+        'team_totals': team_totals,
+        'game_time': game_time
     })
     
-    return jsonify({
+    update_leaderboards(game_data, team, player_index, stat_type, previous_value, value)
+    
+    return {
         'success': True,
         'total_points': total_points,
-        'team_totals': calculate_team_totals_from_data(game_data)
-    })
+        'team_totals': team_totals,
+        'game_time': game_time
+    }
 
-@app.route('/update_team_name', methods=['POST'])
-def update_team_name():
-    data = request.json
-    team = data['team']  # 'team1' or 'team2'
-    new_name = data['name']
-    game_id = data.get('game_id')
+def apply_team_name_update(team, new_name, game_id, report_error=None):
+    """Rename a team, broadcast it and return the result payload (saved like apply_stat_update)"""
+    if supabase is not None and game_id:
+        # Only active games can be renamed
+        game_data = get_game_state(game_id)
+        if game_data is None:
+            return {'success': False, 'error': 'Game not found or not active'}
+        if team not in ('team1', 'team2'):
+            return {'success': False, 'error': 'Invalid team'}
+        
+        old_name = game_data[f'{team}_name']
+        game_data[f'{team}_name'] = new_name
+        error = save_game_change(game_id, report_error)
+        if error:
+            if game_data[f'{team}_name'] == new_name:
+                game_data[f'{team}_name'] = old_name
+            return {'success': False, 'error': error}
+        
+        # Broadcast the update to all connected clients
+        broadcast_update('team_name_update', {
+            'team': team,
+            'name': new_name
+        })
+        
+        return {'success': True, 'message': 'Team name updated successfully'}
     
-    # Update in Supabase if available
+    return {'success': False, 'error': 'No database connection or game ID'}
+
+def apply_player_name_update(team, player_index, new_name, game_id, report_error=None):
+    """Rename a player, broadcast it and return the result payload (saved like apply_stat_update)"""
     if supabase is not None and game_id:
+        # Only active games accept changes
+        game_data = get_game_state(game_id)
+        if game_data is None:
+            return {'success': False, 'error': 'Game not found or not active'}
+        if team not in ('team1', 'team2') or not isinstance(player_index, int) \
+                or not 0 <= player_index < len(game_data[team]):
+            return {'success': False, 'error': 'Invalid player index'}
+        
+        player = game_data[team][player_index]
+        old_name = player.get('name') or ''
+        player['name'] = new_name
+        error = save_game_change(game_id, report_error)
+        if error:
+            if player['name'] == new_name:
+                player['name'] = old_name
+            return {'success': False, 'error': error}
+        
+        # Broadcast the update to all connected clients
+        broadcast_update('player_name_update', {
+            'team': team,
+            'player_index': player_index,
+            'name': new_name
+        })
+        
+        rename_in_leaderboards(game_data, team, player_index, old_name)
+        
+        return {'success': True, 'message': 'Player name updated successfully'}
+    
+    return {'success': False, 'error': 'No database connection or game ID'}
+
+def season_player_key(player):
+    """Season leaderboard key for a player, or None for unnamed players"""
+    name = (player.get('name') or '').strip()
+    return name.lower() or None
+
+def game_leader_name(player, player_index):
+    """Name shown on the game leaderboard, falling back to the jersey number"""
+    return player.get('name') or f'#{player.get("jersey_number", player_index + 1)}'
+
+def fetch_all_rows(table, columns, order_column):
+    """Every row of a table, fetched page by page in a stable order"""
+    rows = []
+    while True:
+        page = (supabase.table(table).select(columns).order(order_column)
+                .range(len(rows), len(rows) + SEASON_SEED_PAGE_SIZE - 1).execute().data)
+        if not page:
+            return rows
+        rows += page
+
+def build_game_leaderboard(game_data):
+    """Build the live leaderboard for a game from its full box score"""
+    board = Leaderboard(LEADERBOARD_SIZE)
+    for team in ('team1', 'team2'):
+        for index, player in enumerate(game_data.get(team, [])):
+            board.set(f'{team}:{index}', game_leader_name(player, index), player_stat_values(player))
+    return board
+
+def get_game_leaderboard(game_data):
+    """Live leaderboard for a game, built on first use"""
+    game_key = str(game_data.get('game_id'))
+    board = live_leaderboards.get(game_key)
+    if board is None:
+        board = live_leaderboards[game_key] = build_game_leaderboard(game_data)
+    return board
+
+def get_season_leaderboard():
+    """Season leaderboard, seeded once from archived and live box scores"""
+    global season_leaderboard
+    if season_leaderboard is not None:
+        return season_leaderboard
+    
+    # Query outside the lock: waiting on the network while holding it would
+    # block every other greenlet that needs the board
+    box_scores = []
+    if supabase is not None:
         try:
-            # Update the team name in the database
-            update_data = {f'{team}_name': new_name}
-            supabase.table('live_games').update(update_data).eq('id', game_id).execute()
-            
-            # Broadcast the update to all connected clients
-            broadcast_update('team_name_update', {
-                'team': team,
-                'name': new_name
-            })
-            
-            return jsonify({'success': True, 'message': 'Team name updated successfully'})
+            box_scores += fetch_all_rows('game_box_scores', 'team1_data, team2_data', 'game_id')
+            box_scores += fetch_all_rows('live_games', 'team1_data, team2_data', 'id')
         except Exception as e:
-            print(f"Error updating team name: {e}")
-            return jsonify({'success': False, 'error': 'Failed to update team name in database'})
+            print(f"Error loading season leaderboard: {e}")
+    
+    board = Leaderboard(LEADERBOARD_SIZE)
+    for game in box_scores:
+        for player in (game.get('team1_data') or []) + (game.get('team2_data') or []):
+            key = season_player_key(player)
+            if key:
+                board.add(key, player['name'].strip(), player_stat_values(player))
+    
+    with season_leaderboard_lock:
+        # Another request may have finished seeding first; keep its board
+        if season_leaderboard is None:
+            season_leaderboard = board
+        return season_leaderboard
+
+def update_leaderboards(game_data, team, player_index, stat_type, previous_value, value):
+    """Fold one stat change into the game and season leaderboards.
+
+    Only broadcasts a leaders_update when the displayed leaders change.
+    """
+    game_id = game_data.get('game_id')
+    is_new_board = str(game_id) not in live_leaderboards
+    board = get_game_leaderboard(game_data)
+    
+    player = game_data[team][player_index]
+    key = f'{team}:{player_index}'
+    game_changed = board.set(key, game_leader_name(player, player_index), player_stat_values(player))
+    
+    if game_changed or is_new_board:
+        broadcast_update('leaders_update', {'scope': 'game', 'game_id': game_id, 'leaders': board.snapshot()})
+    
+    season_key = season_player_key(player)
+    if season_key:
+        # A board seeded by this call was read after the write and already includes it
+        already_seeded = season_leaderboard is not None
+        season = get_season_leaderboard()
+        deltas = stat_change_deltas(stat_type, value - previous_value)
+        if already_seeded and season.add(season_key, player['name'].strip(), deltas):
+            broadcast_update('leaders_update', {'scope': 'season', 'leaders': season.snapshot()})
+
+def rename_in_leaderboards(game_data, team, player_index, old_name):
+    """Follow a player rename on the game and season leaderboards.
+
+    The season board is keyed by name, so this game's stats move from the
+    old name (if any) to the new one; stats from other games stay put.
+    """
+    game_id = game_data.get('game_id')
+    player = game_data[team][player_index]
+    
+    board = live_leaderboards.get(str(game_id))
+    if board is not None and board.rename(f'{team}:{player_index}', game_leader_name(player, player_index)):
+        broadcast_update('leaders_update', {'scope': 'game', 'game_id': game_id, 'leaders': board.snapshot()})
+    
+    # An unseeded board reads the renamed box score when it is seeded
+    season = season_leaderboard
+    if season is None:
+        return
+    
+    old_key = season_player_key({'name': old_name})
+    new_key = season_player_key(player)
+    if old_key == new_key:
+        changed = bool(new_key) and season.rename(new_key, player['name'].strip())
+    else:
+        values = player_stat_values(player)
+        changed = False
+        if old_key:
+            changed = season.add(old_key, old_name.strip(), {stat: -value for stat, value in values.items()})
+        if new_key:
+            changed = season.add(new_key, player['name'].strip(), values) or changed
+    if changed:
+        broadcast_update('leaders_update', {'scope': 'season', 'leaders': season.snapshot()})
+
+def box_score_baseline(game_data):
+    """Current stat values of a game, keyed like GameClock stat events"""
+    return {
+        (team, player_index, stat_type): player.get(stat_type, 0)
+        for team in ('team1', 'team2')
+        for player_index, player in enumerate(game_data.get(team) or [])
+        for stat_type in STAT_TYPES
+    }
+
+def get_game_clock(game_data):
+    """Clock for a known game, created stopped at the start of period 1.
+
+    Only call this with game data for an active game. A clock saved on the
+    game's row (e.g. before the worker was recycled) is resumed, and a new
+    clock starts its period splits from the game's current box score.
+    """
+    game_key = str(game_data.get('game_id'))
+    clock = game_clocks.get(game_key)
+    if clock is None:
+        clock = GameClock(game_key, period_seconds=CLOCK_PERIOD_SECONDS, baseline=box_score_baseline(game_data))
+        if game_data.get('clock_state'):
+            clock.restore(**game_data['clock_state'])
+            if clock.running:
+                schedule_clock_events(clock)
+        game_clocks[game_key] = clock
+    return clock
+
+def save_clock_state(clock):
+    """Store a clock's state on its live_games row so it survives worker restarts"""
+    if supabase is None:
+        return
+    
+    try:
+        columns = {f'clock_{field}': value for field, value in clock.state().items()}
+        supabase.table('live_games').update(columns).eq('id', clock.game_id).eq('status', 'active').execute()
+    except Exception as e:
+        print(f"Error saving clock for game {clock.game_id}: {e}")
+
+def fetch_active_game(game_id):
+    """Game data for an active game by id, or None if it is unknown or finished"""
+    if supabase is None:
+        return None
+    
+    try:
+        response = supabase.table('live_games').select('*').eq('id', game_id).eq('status', 'active').execute()
+        if response.data:
+            active_game_ids.add(str(game_id))
+            return live_game_from_row(response.data[0])
+    except Exception as e:
+        print(f"Error fetching game {game_id}: {e}")
+    return None
+
+def is_active_game(game_id):
+    """True if game_id is an active game; only unseen ids hit the backend"""
+    return str(game_id) in active_game_ids or fetch_active_game(game_id) is not None
+
+def schedule_clock_events(clock):
+    """Queue the period-end transition and sync ticks for a running clock.
+
+    Both callbacks capture the clock's generation, so pausing or changing
+    period silently cancels them.
+    """
+    generation = clock.generation
+    
+    def on_period_end():
+        if clock.expire(generation):
+            save_clock_state(clock)
+            broadcast_update('clock_update', {**clock.snapshot(), 'reason': 'period_end'})
     
-    return jsonify({'success': False, 'error': 'No database connection or game ID'})
+    def on_sync():
+        if clock.generation == generation and clock.running:
+            broadcast_update('clock_sync', clock.snapshot())
+            clock_scheduler.schedule(CLOCK_SYNC_INTERVAL, on_sync)
+    
+    clock_scheduler.schedule(clock.remaining(), on_period_end)
+    clock_scheduler.schedule(CLOCK_SYNC_INTERVAL, on_sync)
+
+def apply_clock_action(game_id, action):
+    """Start, pause or advance a game clock and broadcast the transition"""
+    if not game_id:
+        return {'success': False, 'error': 'No game ID'}
+    if action not in CLOCK_ACTIONS:
+        return {'success': False, 'error': f'Unknown clock action: {action}'}
+    
+    clock = game_clocks.get(str(game_id))
+    if clock is None:
+        game_data = fetch_active_game(game_id)
+        if game_data is None:
+            return {'success': False, 'error': 'Game not found or not active'}
+        clock = get_game_clock(game_data)
+    
+    if action == 'start':
+        changed = clock.start()
+        if changed:
+            schedule_clock_events(clock)
+    elif action == 'pause':
+        changed = clock.pause()
+    else:
+        changed = clock.next_period()
+    
+    snapshot = clock.snapshot()
+    if not changed:
+        return {'success': False, 'error': f'Cannot {action.replace("_", " ")} now', 'clock': snapshot}
+    
+    save_clock_state(clock)
+    broadcast_update('clock_update', {**snapshot, 'reason': action})
+    return {'success': True, 'clock': snapshot}
+
+def request_client_id():
+    """Identify the calling client (ProxyFix resolves it from trusted proxies only)"""
+    return request.remote_addr
+
+def get_write_bucket(buckets, key, rate, burst):
+    """Token bucket for a game or client, created on first use"""
+    bucket = buckets.get(key)
+    if bucket is None:
+        if buckets is client_write_buckets and len(buckets) >= MAX_TRACKED_CLIENTS:
+            # Forget clients whose buckets have refilled completely
+            idle_before = time.monotonic() - CLIENT_WRITE_BURST / CLIENT_WRITE_RATE
+            for idle_key in [k for k, b in buckets.items() if b.updated < idle_before]:
+                del buckets[idle_key]
+        bucket = buckets[key] = TokenBucket(rate, burst)
+    return bucket
+
+def rate_limited(bucket):
+    """Rejection payload for an empty token bucket"""
+    return {'success': False, 'error': 'Too many updates, slow down', 'status': 429,
+            'retry_after': round(bucket.retry_after(), 2)}
+
+def admit_write(game_id, client_id):
+    """Admit a mutation, or return a rejection payload with retry_after.
+
+    The client's token bucket is checked first, so one noisy client cannot
+    drain its game's budget or make us look up made-up game ids. Writes to
+    games that are not active get 404 and leave no per-game state behind.
+    Otherwise writes are shed with 503 while the game already has
+    MAX_INFLIGHT_WRITES in progress, and rate limited with 429 when the
+    game's token bucket is empty.
+    """
+    game_key = str(game_id)
+    with admission_lock:
+        bucket = get_write_bucket(client_write_buckets, client_id, CLIENT_WRITE_RATE, CLIENT_WRITE_BURST)
+        if not bucket.try_acquire():
+            if game_key in admission_stats:
+                admission_stats[game_key]['rate_limited'] += 1
+            return rate_limited(bucket)
+    
+    # May be a backend round trip, so done outside the lock
+    if supabase is not None and game_id and not is_active_game(game_id):
+        return {'success': False, 'error': 'Game not found or not active', 'status': 404}
+    
+    with admission_lock:
+        stats = admission_stats.setdefault(game_key, {'admitted': 0, 'rate_limited': 0, 'shed': 0})
+        
+        inflight = game_inflight_writes.get(game_key, 0)
+        if inflight >= MAX_INFLIGHT_WRITES:
+            stats['shed'] += 1
+            return {'success': False, 'error': 'Game is busy, retry shortly', 'status': 503,
+                    'retry_after': round(0.25 * inflight + random.random() * 0.25, 2)}
+        
+        bucket = get_write_bucket(game_write_buckets, game_key, GAME_WRITE_RATE, GAME_WRITE_BURST)
+        if not bucket.try_acquire():
+            stats['rate_limited'] += 1
+            return rate_limited(bucket)
+        
+        game_inflight_writes[game_key] = inflight + 1
+        stats['admitted'] += 1
+    return None
+
+def finish_write(game_id):
+    """Release a game's in-flight write slot"""
+    game_key = str(game_id)
+    with admission_lock:
+        inflight = game_inflight_writes.get(game_key)
+        # The entry is already gone if the game ended while this write ran
+        if inflight:
+            game_inflight_writes[game_key] = inflight - 1
+
+def forget_game(game_id):
+    """Drop an ended game's admission state"""
+    game_key = str(game_id)
+    active_game_ids.discard(game_key)
+    with admission_lock:
+        game_write_buckets.pop(game_key, None)
+        game_inflight_writes.pop(game_key, None)
+        admission_stats.pop(game_key, None)
+
+def run_admitted(game_id, client_id, apply, *args):
+    """Run a mutation through admission control and return its result payload"""
+    rejection = admit_write(game_id, client_id)
+    if rejection is not None:
+        return rejection
+    try:
+        return apply(*args)
+    finally:
+        finish_write(game_id)
+
+def mutation_response(result):
+    """JSON response for a mutation, with Retry-After when it was refused"""
+    status = result.pop('status', 200)
+    response = jsonify(result)
+    if 'retry_after' in result:
+        response.headers['Retry-After'] = str(max(1, math.ceil(result['retry_after'])))
+    return response, status
+
+@app.route('/update_player_stat', methods=['POST'])
+def update_player_stat():
+    data = request.json
+    game_id = data.get('game_id')
+    result = run_admitted(game_id, request_client_id(), apply_stat_update,
+                          data['team'], data['player_index'], data['stat_type'], int(data['value']), game_id)
+    return mutation_response(result)
+
+@app.route('/update_team_name', methods=['POST'])
+def update_team_name():
+    data = request.json
+    team = data['team']  # 'team1' or 'team2'
+    game_id = data.get('game_id')
+    result = run_admitted(game_id, request_client_id(), apply_team_name_update, team, data['name'], game_id)
+    return mutation_response(result)
 
 @app.route('/update_player_name', methods=['POST'])
 def update_player_name():
     data = request.json
     team = data['team']  # 'team1' or 'team2'
-    player_index = data['player_index']
-    new_name = data['name']
     game_id = data.get('game_id')
+    result = run_admitted(game_id, request_client_id(), apply_player_name_update,
+                          team, data['player_index'], data['name'], game_id)
+    return mutation_response(result)
+
+@app.route('/update_clock', methods=['POST'])
+def update_clock():
+    data = request.json
+    game_id = data.get('game_id')
+    result = run_admitted(game_id, request_client_id(), apply_clock_action, game_id, data.get('action'))
+    return mutation_response(result)
+
+@app.route('/metrics')
+def metrics():
+    """Admission control and connection metrics for this worker"""
+    with admission_lock:
+        games = {
+            game_key: {
+                **stats,
+                'inflight': game_inflight_writes.get(game_key, 0),
+                'tokens': round(game_write_buckets[game_key].available(), 1) if game_key in game_write_buckets else GAME_WRITE_BURST
+            }
+            for game_key, stats in admission_stats.items()
+        }
+        tracked_clients = len(client_write_buckets)
     
-    # Update in Supabase if available
-    if supabase is not None and game_id:
-        try:
-            # Get current game data
-            response = supabase.table('live_games').select('*').eq('id', game_id).execute()
-            
-            if response.data:
-                game_data = response.data[0]
-                team_data = game_data[f'{team}_data']
-                
-                # Update the player name
-                if player_index < len(team_data):
-                    team_data[player_index]['name'] = new_name
-                    
-                    # Update the database
-                    update_data = {f'{team}_data': team_data}
-                    supabase.table('live_games').update(update_data).eq('id', game_id).execute()
-                    
-                    # Broadcast the update to all connected clients
-                    broadcast_update('player_name_update', {
-                        'team': team,
-                        'player_index': player_index,
-                        'name': new_name
-                    })
-                    
-                    return jsonify({'success': True, 'message': 'Player name updated successfully'})
-                else:
-                    return jsonify({'success': False, 'error': 'Invalid player index'})
-            else:
-                return jsonify({'success': False, 'error': 'Game not found'})
-        except Exception as e:
-            print(f"Error updating player name: {e}")
-            return jsonify({'success': False, 'error': 'Failed to update player name in database'})
+    return jsonify({
+        'admission': {
+            'games': games,
+            'tracked_clients': tracked_clients,
+            'limits': {
+                'game_rate': GAME_WRITE_RATE,
+                'game_burst': GAME_WRITE_BURST,
+                'client_rate': CLIENT_WRITE_RATE,
+                'client_burst': CLIENT_WRITE_BURST,
+                'max_inflight_writes': MAX_INFLIGHT_WRITES
+            }
+        },
+        'sse_clients': len(sse_clients),
+        'ws_clients': len(ws_clients)
+    })
+
+@app.route('/end_game', methods=['POST'])
+def end_game():
+    data = request.json
+    game_id = data.get('game_id')
+    
+    if supabase is None or not game_id:
+        return jsonify({'success': False, 'error': 'No database connection or game ID'})
+    
+    # End this game and start the next one exactly once, here, rather than
+    # from every client that reloads when it hears the game ended
+    with live_game_lock:
+        with game_write_lock(game_id):
+            # Save changes still waiting for a background save, then stop taking them
+            save_game_state(game_id)
+            if not end_live_game(game_id):
+                return jsonify({'success': False, 'error': 'Game not found or already ended'})
+            game_states.pop(str(game_id), None)
+        next_game_id = create_new_live_game().get('game_id')
     
-    return jsonify({'success': False, 'error': 'No database connection or game ID'})
+    # Tell spectators the game is over and which game comes next
+    live_leaderboards.pop(str(game_id), None)
+    game_clocks.pop(str(game_id), None)
+    forget_game(game_id)
+    broadcast_update('game_ended', {'game_id': game_id, 'next_game_id': next_game_id})
+    
+    return jsonify({'success': True, 'message': 'Game ended successfully', 'next_game_id': next_game_id})
+
+@app.route('/api/leaders')
+def api_leaders():
+    """Current game leaders for the live game"""
+    game_data = get_live_game_data()
+    return jsonify({'game_id': game_data.get('game_id'), 'leaders': get_game_leaderboard(game_data).snapshot()})
+
+@app.route('/api/leaders/season')
+def api_season_leaders():
+    """Season leaders across archived and live games"""
+    return jsonify({'leaders': get_season_leaderboard().snapshot()})
+
+def request_game_clock():
+    """Existing clock for the requested game_id, or the live game's clock"""
+    game_id = request.args.get('game_id')
+    if game_id:
+        return game_clocks.get(game_id)
+    return get_game_clock(get_live_game_data())
+
+@app.route('/api/clock')
+def api_clock():
+    """Clock state for a game (defaults to the live game)"""
+    clock = request_game_clock()
+    if clock is None:
+        return jsonify({'error': 'No clock for this game'}), 404
+    return jsonify(clock.snapshot())
+
+@app.route('/api/clock/splits')
+def api_clock_splits():
+    """Per-period stat splits from game-time stamped stat events"""
+    clock = request_game_clock()
+    if clock is None:
+        return jsonify({'error': 'No clock for this game'}), 404
+    return jsonify(clock.period_splits())
+
+@app.route('/api/archive')
+def api_archive():
+    """Page through archived game summaries"""
+    if supabase is None:
+        return jsonify([])
+    
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    offset = request.args.get('offset', 0, type=int)
+    try:
+        response = supabase.table('game_summaries').select('*').order('played_at', desc=True).range(offset, offset + limit - 1).execute()
+        return jsonify(response.data)
+    except Exception as e:
+        print(f"Error fetching archived games: {e}")
+        return jsonify({'success': False, 'error': 'Failed to fetch archived games'}), 500
+
+@app.route('/api/archive/<int:game_id>/box_score')
+def api_archive_box_score(game_id):
+    """Load the cold box score for one archived game"""
+    if supabase is None:
+        return jsonify({'success': False, 'error': 'No database connection'}), 503
+    
+    try:
+        response = supabase.table('game_box_scores').select('*').eq('game_id', game_id).execute()
+        if not response.data:
+            return jsonify({'success': False, 'error': 'Game not found'}), 404
+        return jsonify(response.data[0])
+    except Exception as e:
+        print(f"Error fetching box score: {e}")
+        return jsonify({'success': False, 'error': 'Failed to fetch box score'}), 500
 
 def broadcast_update(event_type, data):
-    """Broadcast updates to all connected SSE clients"""
-    message = json.dumps({
+    """Broadcast updates to all connected SSE and WebSocket clients"""
+    payload = {
         'type': event_type,
         'data': data,
         'timestamp': datetime.now().isoformat()
-    })
+    }
+    message = json.dumps(payload)
     
     # Remove disconnected clients
     global sse_clients
@@ -300,11 +1361,140 @@ def broadcast_update(event_type, data):
             pass
     
     sse_clients = active_clients
-    print(f"📡 Broadcasted {event_type} to {len(active_clients)} clients")
+    
+    # Scorekeepers get the same event as a binary frame on their socket
+    if ws_clients:
+        frame = pack_frame({'op': 'event', **payload})
+        for client in list(ws_clients):
+            client.put(frame, block=False)
+    
+    print(f"📡 Broadcasted {event_type} to {len(active_clients)} SSE and {len(ws_clients)} WebSocket clients")
+
+def pack_frame(message):
+    """Encode a scorekeeper message as a MessagePack binary frame"""
+    return msgpack.packb(message, use_bin_type=True)
+
+def handle_scorekeeper_frame(frame, client_id, send):
+    """Apply one binary scorekeeper operation and return the encoded ack.
+
+    Acks go out once an op is validated and applied in memory; the database
+    write happens in the background and a failure is sent as a save_error
+    message through `send`.
+    """
+    try:
+        message = msgpack.unpackb(frame, raw=False)
+        op = message.get('op')
+        seq = message.get('seq')
+    except Exception:
+        return pack_frame({'op': 'ack', 'seq': None, 'success': False, 'error': 'Malformed frame'})
+    
+    try:
+        game_id = message.get('game_id')
+        
+        def report_error(error):
+            # The op was already acked, so report the failed save separately
+            send({'op': 'save_error', 'seq': seq, 'game_id': game_id, 'error': error})
+        
+        if op == 'stat':
+            result = run_admitted(game_id, client_id, apply_stat_update, message['team'], message['player_index'],
+                                  message['stat_type'], int(message['value']), game_id, report_error)
+        elif op == 'team_name':
+            result = run_admitted(game_id, client_id, apply_team_name_update, message['team'], message['name'],
+                                  game_id, report_error)
+        elif op == 'player_name':
+            result = run_admitted(game_id, client_id, apply_player_name_update, message['team'],
+                                  message['player_index'], message['name'], game_id, report_error)
+        elif op == 'clock':
+            result = run_admitted(game_id, client_id, apply_clock_action, game_id, message.get('action'))
+        else:
+            result = {'success': False, 'error': f'Unknown op: {op}'}
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        result = {'success': False, 'error': f'Invalid {op} operation: {e}'}
+    
+    result.pop('status', None)
+    return pack_frame({'op': 'ack', 'seq': seq, **result})
+
+if sock is not None:
+    @sock.route('/ws/scorekeeper')
+    def scorekeeper_socket(ws):
+        """WebSocket endpoint for scorekeepers: stat ops in, acks and broadcasts out"""
+        import queue
+        client_id = request_client_id()
+        client_queue = queue.Queue()
+        ws_clients.append(client_queue)
+        print(f"🔌 New scorekeeper WebSocket connected. Total scorekeepers: {len(ws_clients)}")
+        
+        def send_frames():
+            # Single writer so acks and broadcasts never interleave on the socket
+            while True:
+                frame = client_queue.get()
+                if frame is None:
+                    break
+                try:
+                    ws.send(frame)
+                except Exception:
+                    break
+        
+        writer = threading.Thread(target=send_frames, daemon=True)
+        writer.start()
+        
+        try:
+            while True:
+                frame = ws.receive()
+                if frame is None:
+                    break
+                client_queue.put(handle_scorekeeper_frame(frame, client_id, lambda message: client_queue.put(pack_frame(message))))
+        except Exception:
+            # Client disconnected
+            pass
+        finally:
+            if client_queue in ws_clients:
+                ws_clients.remove(client_queue)
+            client_queue.put(None)
+            writer.join(timeout=1)
+            print(f"🔌 Scorekeeper WebSocket disconnected. Remaining scorekeepers: {len(ws_clients)}")
+
+def sse_retry_hint(extra_ms=0):
+    """`retry:` field with per-client jitter so reconnects spread out"""
+    return f"retry: {SSE_RETRY_BASE_MS + extra_ms + random.randint(0, SSE_RETRY_JITTER_MS)}\n\n"
+
+def begin_sse_drain(window=SSE_DRAIN_WINDOW):
+    """Close SSE streams gradually over `window` seconds before the worker exits.
+
+    Each client is told to reconnect with a jittered delay, and the
+    goodbyes are spaced out so the reconnects do not arrive all at once.
+    """
+    if sse_draining.is_set():
+        return
+    sse_draining.set()
+    
+    clients = list(sse_clients)
+    random.shuffle(clients)
+    print(f"🚰 Draining {len(clients)} SSE clients over {window}s")
+    
+    def drain():
+        spacing = window / max(len(clients), 1)
+        for client in clients:
+            client.put(SSE_SHUTDOWN)
+            time.sleep(spacing)
+    
+    threading.Thread(target=drain, name='sse-drain', daemon=True).start()
 
 @app.route('/events')
 def events():
     """SSE endpoint for live updates"""
+    headers = {'Cache-Control': 'no-cache',
+               'Connection': 'keep-alive',
+               'Access-Control-Allow-Origin': '*',
+               'X-Accel-Buffering': 'no'}
+    
+    if sse_draining.is_set() or not sse_admission.try_acquire():
+        # Turn the client away with a jittered retry instead of a hard error,
+        # so EventSource reconnects on its own once there is room
+        wait_ms = 0 if sse_draining.is_set() else int(sse_admission.retry_after() * 1000)
+        busy = sse_retry_hint(wait_ms) + "data: {\"type\": \"busy\"}\n\n"
+        return Response(busy, mimetype='text/event-stream', headers=headers)
+    
     def event_stream():
         import queue
         client_queue = queue.Queue()
@@ -312,6 +1502,14 @@ def events():
         print(f"🔌 New SSE client connected. Total clients: {len(sse_clients)}")
         
         try:
+            # Tell the browser how long to wait before reconnecting
+            yield sse_retry_hint()
+            
+            if sse_draining.is_set():
+                # Admitted just before the drain took its list of clients
+                yield "data: {\"type\": \"shutdown\"}\n\n"
+                return
+            
             # Send initial connection message
             yield "data: {\"type\": \"connected\", \"message\": \"SSE connection established\"}\n\n"
             
@@ -319,30 +1517,36 @@ def events():
                 try:
                     # Wait for updates with timeout
                     message = client_queue.get(timeout=30)
-                    yield message
                 except queue.Empty:
                     # Send heartbeat to keep connection alive
                     yield "data: {\"type\": \"heartbeat\"}\n\n"
-        except GeneratorExit:
-            # Client disconnected
+                    continue
+                
+                if message is SSE_SHUTDOWN:
+                    # Worker is going away: reconnect elsewhere after a jittered delay
+                    yield sse_retry_hint()
+                    yield "data: {\"type\": \"shutdown\"}\n\n"
+                    return
+                yield message
+        finally:
+            # Client disconnected or stream drained
             if client_queue in sse_clients:
                 sse_clients.remove(client_queue)
             print(f"🔌 SSE client disconnected. Remaining clients: {len(sse_clients)}")
     
-    return Response(event_stream(), mimetype='text/event-stream',
-                   headers={'Cache-Control': 'no-cache',
-                           'Connection': 'keep-alive',
-                           'Access-Control-Allow-Origin': '*',
-                           'X-Accel-Buffering': 'no'})
+    return Response(event_stream(), mimetype='text/event-stream', headers=headers)
 
 def get_all_games():
-    """Get all games from the database"""
+    """Get current games, recently archived games and completed games"""
     if supabase is None:
         return []
     
     try:
-        # Get all live games
-        live_games_response = supabase.table('live_games').select('*').order('created_at', desc=True).execute()
+        # Only the small working set of unarchived games lives in live_games
+        live_games_response = supabase.table('live_games').select('*').in_('status', ['active', 'finished']).order('created_at', desc=True).execute()
+        
+        # Archived games are read from the slim summary table
+        archived_games_response = supabase.table('game_summaries').select('*').order('played_at', desc=True).limit(RECENT_ARCHIVED_GAMES).execute()
         
         # Get all completed basketball games
         basketball_games_response = supabase.table('basketball_games').select('*').order('created_at', desc=True).execute()
@@ -351,21 +1555,30 @@ def get_all_games():
         
         # Add live games
         for game in live_games_response.data:
-            # Calculate total scores
-            team1_score = sum((player.get('points_2', 0) * 2) + (player.get('points_3', 0) * 3) for player in game.get('team1_data', []))
-            team2_score = sum((player.get('points_2', 0) * 2) + (player.get('points_3', 0) * 3) for player in game.get('team2_data', []))
-            
             games.append({
                 'id': game['id'],
                 'type': 'live',
                 'date': game['created_at'][:10],  # Extract date part
                 'team1_name': game.get('team1_name', 'TEAM 1'),
                 'team2_name': game.get('team2_name', 'TEAM 2'),
-                'team1_score': team1_score,
-                'team2_score': team2_score,
+                'team1_score': team_score(game.get('team1_data')),
+                'team2_score': team_score(game.get('team2_data')),
                 'status': game.get('status', 'active')
             })
         
+        # Add archived live games
+        for game in archived_games_response.data:
+            games.append({
+                'id': game['game_id'],
+                'type': 'live',
+                'date': game['played_at'][:10],
+                'team1_name': game['team1_name'],
+                'team2_name': game['team2_name'],
+                'team1_score': game['team1_score'],
+                'team2_score': game['team2_score'],
+                'status': 'archived'
+            })
+        
         # Add completed basketball games
         for game in basketball_games_response.data:
             games.append({
@@ -458,24 +1671,34 @@ def search():
     sport = request.args.get('sport', '').lower()
     location = request.args.get('location', '').lower()
     age_range = request.args.get('age_range', '')
+    skill_level = request.args.get('skill_level', '').lower()
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
     
-    filtered_buddies = sports_buddies
-    
-    if sport:
-        filtered_buddies = [b for b in filtered_buddies if sport in b['sport'].lower()]
+    if lat is not None or lng is not None:
+        # Coordinates given: answer from the spatial index instead of scanning
+        radius_km = request.args.get('radius_km', 5, type=float)
+        if not valid_coordinates(lat, lng) or not valid_radius(radius_km):
+            return 'Invalid coordinates or radius', 400
+        filtered_buddies = find_buddies_near(lat, lng, radius_km=radius_km, sport=sport,
+                                             age_range=age_range, skill_level=skill_level)
+    else:
+        filtered_buddies = [b for b in sports_buddies
+                            if buddy_matches(b, sport=sport, age_range=age_range, skill_level=skill_level)]
     
     if location:
         filtered_buddies = [b for b in filtered_buddies if location in b['location'].lower()]
     
-    if age_range:
-        min_age, max_age = map(int, age_range.split('-'))
-        filtered_buddies = [b for b in filtered_buddies if min_age <= b['age'] <= max_age]
-    
     return render_template('buddy_list.html', buddies=filtered_buddies)
 
 @app.route('/add_buddy', methods=['POST'])
 def add_buddy():
     data = request.form
+    latitude = data.get('latitude', type=float)
+    longitude = data.get('longitude', type=float)
+    if (latitude is not None or longitude is not None) and not valid_coordinates(latitude, longitude):
+        return 'Invalid coordinates', 400
+    
     new_buddy = {
         "id": len(sports_buddies) + 1,
         "name": data['name'],
@@ -484,17 +1707,49 @@ def add_buddy():
         "location": data['location'],
         "availability": data['availability'],
         "skill_level": data['skill_level'],
+        "latitude": latitude,
+        "longitude": longitude,
         "created_at": datetime.now().strftime("%Y-%m-%d")
     }
     sports_buddies.append(new_buddy)
+    index_buddy(new_buddy)
     return render_template('buddy_list.html', buddies=sports_buddies)
 
 @app.route('/api/buddies')
 def api_buddies():
     return jsonify(sports_buddies)
 
+@app.route('/api/buddies/nearby')
+def api_buddies_nearby():
+    """Nearest-neighbour and radius search over sports buddies"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if not valid_coordinates(lat, lng):
+        return jsonify({'success': False,
+                        'error': f'lat (within ±{MAX_BUDDY_LATITUDE}) and lng (within ±180) are required'}), 400
+    
+    radius_km = request.args.get('radius_km', type=float)
+    limit = request.args.get('k', type=int)
+    if radius_km is not None and not valid_radius(radius_km):
+        return jsonify({'success': False, 'error': f'radius_km must be greater than 0 and at most {MAX_BUDDY_RADIUS_KM}'}), 400
+    if limit is not None and limit < 1:
+        return jsonify({'success': False, 'error': 'k must be at least 1'}), 400
+    
+    buddies = find_buddies_near(
+        lat, lng,
+        radius_km=radius_km,
+        limit=limit,
+        sport=request.args.get('sport', '').lower(),
+        age_range=request.args.get('age_range', ''),
+        skill_level=request.args.get('skill_level', '').lower()
+    )
+    return jsonify(buddies)
+
+startup_timings['import_ms'] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+print(f"⏱️ App imported in {startup_timings['import_ms']}ms")
+
 if __name__ == '__main__':
-    import os
+    start_warm_up()
     
     # Production configuration
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, precompressed static assets
+Run this before (re)starting the app: python build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Source files under static/ that templates load through asset_url()
+ASSETS = [
+    'css/style.css',
+    'css/index.css',
+    'css/jack.css',
+    'css/live_game.css',
+    'js/live_game.js'
+]
+
+
+def fingerprint(name, content):
+    """Insert a short content hash before the extension: css/a.css -> css/a.1a2b3c4d.css"""
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    base, ext = os.path.splitext(name)
+    return f"{base}.{digest}{ext}"
+
+
+def write_asset(path, content):
+    """Write an asset plus its .gz and (if available) .br variants"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    with open(path + '.gz', 'wb') as f:
+        # mtime=0 keeps the output byte-identical between builds
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def build():
+    """Rebuild static/dist and its manifest from scratch"""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+
+    manifest = {}
+    for name in ASSETS:
+        with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+            content = f.read()
+
+        built_name = fingerprint(name, content)
+        write_asset(os.path.join(DIST_DIR, built_name), content)
+        manifest[name] = built_name
+
+        gz_size = os.path.getsize(os.path.join(DIST_DIR, built_name + '.gz'))
+        print(f"📦 {name} -> {built_name} ({len(content)} bytes, {gz_size} gzipped)")
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        print("💡 Install Brotli (pip install Brotli) to also build .br variants")
+    print(f"✅ Wrote {len(manifest)} assets to {MANIFEST_PATH}")
+    return manifest
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,188 @@
+"""
+Server-side game clocks driven by one shared timer heap
+"""
+import heapq
+import itertools
+import threading
+import time
+
+# Default game format: four 8-minute periods
+DEFAULT_PERIODS = 4
+DEFAULT_PERIOD_SECONDS = 8 * 60
+
+
+class ClockScheduler:
+    """Single background thread running callbacks from a heap of due times.
+
+    All game clocks share this one thread. Callbacks are never removed from
+    the heap; callers cancel them by making the callback a no-op (see
+    GameClock.generation).
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def schedule(self, delay, callback):
+        """Run `callback()` after `delay` seconds"""
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.counter), callback))
+            if self.thread is None:
+                # Started lazily so no thread exists before gunicorn forks
+                self.thread = threading.Thread(target=self._run, name='game-clock', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+                    self.condition.wait(timeout)
+                _, _, callback = heapq.heappop(self.heap)
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in game clock callback: {e}")
+
+
+class GameClock:
+    """Period and time remaining for one game.
+
+    Time is stored as the remaining seconds at the last state change plus
+    the monotonic time of that change, so reading the clock is just
+    arithmetic and nothing needs to tick while it runs.
+    """
+
+    def __init__(self, game_id, periods=DEFAULT_PERIODS, period_seconds=DEFAULT_PERIOD_SECONDS, baseline=None):
+        self.game_id = game_id
+        self.periods = periods
+        self.period_seconds = period_seconds
+        self.period = 1
+        self.running = False
+        self.remaining_at_anchor = float(period_seconds)
+        self.anchor = time.monotonic()
+        # Bumped on every transition so stale scheduled callbacks do nothing
+        self.generation = 0
+        # Stat changes stamped with game time: (period, elapsed_s, team, player_index, stat, value)
+        self.stat_events = []
+        # Stat values when the clock was created: {(team, player_index, stat): value}
+        self.baseline = dict(baseline or {})
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left in the current period"""
+        if not self.running:
+            return self.remaining_at_anchor
+        return max(0.0, self.remaining_at_anchor - (time.monotonic() - self.anchor))
+
+    def _transition(self, running, remaining=None):
+        self.remaining_at_anchor = self.remaining() if remaining is None else float(remaining)
+        self.anchor = time.monotonic()
+        self.running = running
+        self.generation += 1
+
+    def start(self):
+        """Start or resume the clock; returns False if already running or expired"""
+        with self.lock:
+            if self.running or self.remaining() <= 0:
+                return False
+            self._transition(True)
+            return True
+
+    def pause(self):
+        """Stop the clock; returns False if it was not running"""
+        with self.lock:
+            if not self.running:
+                return False
+            self._transition(False)
+            return True
+
+    def expire(self, generation):
+        """End the period if `generation` is still current; returns True if it did"""
+        with self.lock:
+            if generation != self.generation or not self.running:
+                return False
+            self._transition(False, remaining=0)
+            return True
+
+    def next_period(self):
+        """Move to the next period with a full, stopped clock"""
+        with self.lock:
+            if self.period >= self.periods:
+                return False
+            self.period += 1
+            self._transition(False, remaining=self.period_seconds)
+            return True
+
+    def state(self):
+        """Persistable clock state; the anchor is stored as wall-clock time"""
+        with self.lock:
+            return {
+                'period': self.period,
+                'remaining_s': self.remaining_at_anchor,
+                'running': self.running,
+                'anchor_epoch': time.time() - (time.monotonic() - self.anchor)
+            }
+
+    def restore(self, period, remaining_s, running, anchor_epoch):
+        """Resume from state() saved by another process; a running clock keeps counting"""
+        with self.lock:
+            elapsed = max(0.0, time.time() - anchor_epoch) if running else 0.0
+            self.period = period
+            self.remaining_at_anchor = max(0.0, float(remaining_s) - elapsed)
+            self.anchor = time.monotonic()
+            # A period that ran out while nobody was watching has ended
+            self.running = bool(running) and self.remaining_at_anchor > 0
+            self.generation += 1
+
+    def stamp(self, team, player_index, stat_type, value):
+        """Record a stat change at the current game time and return the stamp"""
+        with self.lock:
+            elapsed = round(self.period_seconds - self.remaining(), 1)
+            self.stat_events.append((self.period, elapsed, team, player_index, stat_type, value))
+            return {'period': self.period, 'elapsed_s': elapsed}
+
+    def period_splits(self):
+        """Per-period stat totals derived from the stamped stat events.
+
+        Stat events carry absolute values, so a player's split for a period is
+        their last value in that period minus their last value before it. The
+        first change is measured from the baseline, so stats recorded before
+        the clock existed (e.g. before a restart) are not counted again.
+        """
+        with self.lock:
+            events = list(self.stat_events)
+
+        last_in_period = {}
+        for period, _, team, player_index, stat_type, value in events:
+            last_in_period[(period, team, player_index, stat_type)] = value
+
+        splits = {}
+        previous = dict(self.baseline)
+        for period in range(1, self.period + 1):
+            period_splits = splits.setdefault(period, {})
+            for (p, team, player_index, stat_type), value in last_in_period.items():
+                if p != period:
+                    continue
+                key = (team, player_index, stat_type)
+                delta = value - previous.get(key, 0)
+                previous[key] = value
+                if delta:
+                    player = period_splits.setdefault(f'{team}:{player_index}', {})
+                    player[stat_type] = delta
+        return splits
+
+    def snapshot(self):
+        """Clock state for clients to render a synchronized countdown"""
+        with self.lock:
+            return {
+                'game_id': self.game_id,
+                'period': self.period,
+                'periods': self.periods,
+                'remaining_s': round(self.remaining(), 1),
+                'running': self.running,
+                'server_time': time.time()
+            }
@@ -3,6 +3,9 @@
 
 import multiprocessing
 import os
+import signal
+import threading
+import time
 
 # Server socket
 bind = "127.0.0.1:8000"
@@ -43,7 +46,8 @@ certfile = None
 # Application
 wsgi_app = "app:app"
 
-# Preload application for better performance
+# Preload application for better performance (importing app.py has no
+# backend side effects; the Supabase client is created per worker)
 preload_app = True
 
 # Worker process management
@@ -71,6 +75,38 @@ def post_fork(server, worker):
     """Called just after a worker has been forked."""
     server.log.info("Worker spawned (pid: %s)", worker.pid)
 
+def post_worker_init(worker):
+    """Called after a worker has installed its signal handlers."""
+    from app import begin_sse_drain, init_worker_state, start_warm_up
+    
+    # gevent has patched threading by now: rebuild the app's locks and
+    # timers (created in the master by preload_app) as cooperative ones,
+    # then set up the backend client, template cache and archiver per worker
+    init_worker_state()
+    start_warm_up()
+    
+    # On graceful shutdown (SIGTERM), drain SSE clients before gunicorn's
+    # graceful_timeout runs out instead of dropping them all at once
+    previous_handler = signal.getsignal(signal.SIGTERM)
+    
+    def drain_and_exit(signum, frame):
+        worker.log.info("Draining SSE clients before shutdown")
+        begin_sse_drain()
+        if callable(previous_handler):
+            previous_handler(signum, frame)
+    
+    signal.signal(signal.SIGTERM, drain_and_exit)
+    
+    # Recycling after max_requests only clears worker.alive (no signal), so
+    # also watch for that and drain within the same graceful_timeout
+    def drain_when_retired():
+        while worker.alive:
+            time.sleep(1)
+        worker.log.info("Worker retiring, draining SSE clients")
+        begin_sse_drain()
+    
+    threading.Thread(target=drain_when_retired, name='sse-drain-watch', daemon=True).start()
+
 def worker_abort(worker):
     """Called when a worker received the SIGABRT signal."""
     worker.log.info("Worker received SIGABRT signal")
@@ -0,0 +1,116 @@
+"""
+Incrementally maintained top-k leaderboards for basketball stats
+"""
+import heapq
+import threading
+
+# Stats tracked on every leaderboard
+LEADER_STATS = ('points', 'assists', 'rebounds', 'steals')
+
+
+def player_stat_values(player):
+    """Leaderboard stat values for one player row from team1_data/team2_data"""
+    return {
+        'points': (player.get('points_2', 0) * 2) + (player.get('points_3', 0) * 3),
+        'assists': player.get('assists', 0),
+        'rebounds': player.get('rebounds', 0),
+        'steals': player.get('steals', 0)
+    }
+
+
+def stat_change_deltas(stat_type, delta):
+    """Leaderboard stat deltas for a change of `delta` in one box score column"""
+    if stat_type == 'points_2':
+        return {'points': delta * 2}
+    if stat_type == 'points_3':
+        return {'points': delta * 3}
+    if stat_type in LEADER_STATS:
+        return {stat_type: delta}
+    return {}
+
+
+class TopK:
+    """Top-k ranking over a changing set of values.
+
+    Keeps every value in a dict plus a small sorted list of the current
+    top k. Most updates only touch the top list; a full rebuild with
+    heapq.nsmallest on the rank is only needed when a leader drops below the cut-off.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.values = {}
+        self.top = []  # [(key, value)] ordered best first
+
+    @staticmethod
+    def _rank(item):
+        key, value = item
+        return (-value, key)
+
+    def _rebuild(self):
+        self.top = heapq.nsmallest(self.k, self.values.items(), key=self._rank)
+
+    def update(self, key, value):
+        """Set a key's value; returns True if the leaders or their values changed"""
+        before = list(self.top)
+        keys = [k for k, _ in before]
+        self.values[key] = value
+
+        if key in keys:
+            self.top = sorted([(k, self.values[k]) for k in keys], key=self._rank)
+            # A leader that fell below the cut-off may be overtaken from outside
+            if len(self.values) > self.k and self.top[-1][0] == key:
+                self._rebuild()
+        elif value > 0 and (len(self.top) < self.k or self._rank((key, value)) < self._rank(self.top[-1])):
+            self.top = sorted(self.top + [(key, value)], key=self._rank)[:self.k]
+
+        return self.top != before
+
+    def snapshot(self):
+        """Current leaders as [(key, value)], best first"""
+        return [(key, value) for key, value in self.top if value > 0]
+
+
+class Leaderboard:
+    """Per-stat top-k boards for one scope, such as a live game or the season"""
+
+    def __init__(self, k=5):
+        self.boards = {stat: TopK(k) for stat in LEADER_STATS}
+        self.names = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, name, values):
+        """Replace a player's stat values; returns True if any leaders changed"""
+        with self.lock:
+            self.names[key] = name
+            changed = False
+            for stat, value in values.items():
+                if stat in self.boards and self.boards[stat].values.get(key) != value:
+                    changed = self.boards[stat].update(key, value) or changed
+            return changed
+
+    def add(self, key, name, deltas):
+        """Apply stat deltas to a player; returns True if any leaders changed"""
+        with self.lock:
+            self.names[key] = name
+            changed = False
+            for stat, delta in deltas.items():
+                if stat in self.boards and delta:
+                    board = self.boards[stat]
+                    changed = board.update(key, board.values.get(key, 0) + delta) or changed
+            return changed
+
+    def rename(self, key, name):
+        """Change a player's display name; returns True if they are currently shown as a leader"""
+        with self.lock:
+            self.names[key] = name
+            return any(k == key for board in self.boards.values() for k, _ in board.snapshot())
+
+    def snapshot(self):
+        """Leaders for every stat in O(k) per stat"""
+        with self.lock:
+            return {
+                stat: [{'key': key, 'name': self.names.get(key, ''), 'value': value}
+                       for key, value in board.snapshot()]
+                for stat, board in self.boards.items()
+            }
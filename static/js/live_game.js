@@ -0,0 +1,571 @@
+function updateTeamName(team, newName) {
+    // Update all instances of the team name in the UI
+    if (team === 'team1') {
+        document.getElementById('team1-name').value = newName;
+        document.getElementById('team1-header-name').value = newName;
+    } else {
+        document.getElementById('team2-name').value = newName;
+        document.getElementById('team2-header-name').value = newName;
+    }
+
+    // Save to database
+    const gameId = document.getElementById('game-id').dataset.gameId;
+    if (gameId) {
+        sendMutation('/update_team_name', 'team_name', {
+            team: team,
+            name: newName,
+            game_id: gameId
+        })
+        .then(data => {
+            if (data.success) {
+                console.log('Team name updated successfully:', newName);
+            } else {
+                console.error('Failed to update team name:', data.error);
+            }
+        })
+        .catch(error => {
+            console.error('Error updating team name:', error);
+        });
+    }
+}
+
+function updateJerseyNumber(input) {
+    const team = input.dataset.team;
+    const playerIndex = parseInt(input.dataset.player);
+    const newNumber = input.value;
+
+    // Update the jersey number in the backend (you can add an API call here if needed)
+    console.log(`Updated ${team} player ${playerIndex} jersey number to: ${newNumber}`);
+}
+
+function updatePosition(select) {
+    const team = select.dataset.team;
+    const playerIndex = parseInt(select.dataset.player);
+    const newPosition = select.value;
+
+    // Update the position in the backend (you can add an API call here if needed)
+    console.log(`Updated ${team} player ${playerIndex} position to: ${newPosition}`);
+}
+
+function updatePlayerName(input) {
+    const team = input.dataset.team;
+    const playerIndex = parseInt(input.dataset.player);
+    const newName = input.value;
+
+    // Save to database
+    const gameId = document.getElementById('game-id').dataset.gameId;
+    if (gameId) {
+        sendMutation('/update_player_name', 'player_name', {
+            team: team,
+            player_index: playerIndex,
+            name: newName,
+            game_id: gameId
+        })
+        .then(data => {
+            if (data.success) {
+                console.log('Player name updated successfully:', newName);
+            } else {
+                console.error('Failed to update player name:', data.error);
+            }
+        })
+        .catch(error => {
+            console.error('Error updating player name:', error);
+        });
+    }
+}
+
+// Scorekeeper WebSocket: opened on the first edit so spectators stay on SSE only
+const scorekeeper = {
+    socket: null,
+    ready: false,
+    seq: 0,
+    pending: {}
+};
+
+function openScorekeeperSocket() {
+    if (scorekeeper.socket || !window.WebSocket || !window.MessagePack) {
+        return;
+    }
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/scorekeeper`);
+    socket.binaryType = 'arraybuffer';
+
+    socket.onopen = function() {
+        console.log('Scorekeeper WebSocket opened');
+        scorekeeper.ready = true;
+        // Broadcasts now arrive on the socket, so drop the SSE stream
+        closeEventStream();
+        updateConnectionStatus('connected');
+    };
+
+    socket.onmessage = function(event) {
+        const message = MessagePack.decode(new Uint8Array(event.data));
+        if (message.op === 'ack') {
+            const pending = scorekeeper.pending[message.seq];
+            if (pending) {
+                delete scorekeeper.pending[message.seq];
+                pending.resolve(message);
+            }
+        } else if (message.op === 'save_error') {
+            // Already acked, but the server could not save it to the database
+            console.error('Change not saved:', message.error);
+            updateConnectionStatus('unsaved');
+        } else if (message.op === 'event') {
+            handleLiveUpdate(message);
+        }
+    };
+
+    socket.onclose = function() {
+        console.log('Scorekeeper WebSocket closed, falling back to HTTP');
+        scorekeeper.socket = null;
+        scorekeeper.ready = false;
+        Object.values(scorekeeper.pending).forEach(pending => pending.reject(new Error('WebSocket closed')));
+        scorekeeper.pending = {};
+        openEventStream();
+    };
+
+    scorekeeper.socket = socket;
+}
+
+function sendMutation(url, op, payload) {
+    openScorekeeperSocket();
+
+    if (scorekeeper.ready) {
+        return new Promise((resolve, reject) => {
+            const seq = ++scorekeeper.seq;
+            scorekeeper.pending[seq] = { resolve, reject };
+            scorekeeper.socket.send(MessagePack.encode(Object.assign({ op: op, seq: seq }, payload)));
+        });
+    }
+
+    return fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(payload)
+    })
+    .then(response => response.json());
+}
+
+// Track click timing for double-click detection
+let clickTimers = {};
+
+// Get game ID from the page data
+const gameId = document.getElementById('game-id').dataset.gameId || null;
+
+// SSE stream for live updates; closed while the scorekeeper socket is open
+let eventSource = null;
+let eventSourceRetryTimer = null;
+let eventSourceRetryDelay = 1000;
+const EVENT_SOURCE_MAX_RETRY_DELAY = 30000;
+
+function openEventStream() {
+    if (eventSource || scorekeeper.ready) {
+        return;
+    }
+
+    const source = new EventSource('/events');
+    eventSource = source;
+
+    source.onopen = function() {
+        console.log('SSE connection opened');
+        eventSourceRetryDelay = 1000;
+        updateConnectionStatus('connected');
+    };
+
+    source.onerror = function() {
+        console.log('SSE connection error');
+        updateConnectionStatus('disconnected');
+        // EventSource retries dropped streams on its own, but gives up for
+        // good after a non-200 response (e.g. a 502 while the server restarts)
+        if (source.readyState === EventSource.CLOSED && eventSource === source) {
+            eventSource = null;
+            scheduleEventStreamReopen();
+        }
+    };
+
+    eventSource.onmessage = function(event) {
+        try {
+            const data = JSON.parse(event.data);
+            handleLiveUpdate(data);
+        } catch (error) {
+            console.error('Error parsing SSE message:', error);
+        }
+    };
+}
+
+function scheduleEventStreamReopen() {
+    if (eventSourceRetryTimer) {
+        return;
+    }
+    // Jittered exponential backoff so spectators don't all come back at once
+    const delay = eventSourceRetryDelay / 2 + Math.random() * eventSourceRetryDelay;
+    eventSourceRetryDelay = Math.min(eventSourceRetryDelay * 2, EVENT_SOURCE_MAX_RETRY_DELAY);
+    eventSourceRetryTimer = setTimeout(() => {
+        eventSourceRetryTimer = null;
+        openEventStream();
+    }, delay);
+}
+
+function closeEventStream() {
+    clearTimeout(eventSourceRetryTimer);
+    eventSourceRetryTimer = null;
+    if (eventSource) {
+        console.log('SSE connection closed');
+        eventSource.close();
+        eventSource = null;
+    }
+}
+
+openEventStream();
+
+function updateConnectionStatus(status) {
+    const statusElement = document.getElementById('live-status');
+    if (statusElement) {
+        statusElement.className = `live-status ${status}`;
+        switch (status) {
+            case 'connected':
+                statusElement.textContent = '🟢 Live Connected';
+                break;
+            case 'disconnected':
+                statusElement.textContent = '🔴 Disconnected';
+                break;
+            case 'unsaved':
+                statusElement.textContent = '⚠️ Changes Not Saved';
+                break;
+            case 'update':
+                statusElement.textContent = '🟡 Update Received';
+                setTimeout(() => updateConnectionStatus('connected'), 1000);
+                break;
+        }
+    }
+}
+
+function handleLiveUpdate(data) {
+    console.log('📡 Received SSE update:', data);
+
+    // Show update indicator (except for heartbeat)
+    if (!['heartbeat', 'connected', 'shutdown', 'busy'].includes(data.type)) {
+        updateConnectionStatus('update');
+    }
+
+    switch (data.type) {
+        case 'connected':
+            console.log('✅ SSE connection established');
+            updateConnectionStatus('connected');
+            break;
+        case 'stat_update':
+            console.log('📊 Stat update received:', data.data);
+            updateStatDisplay(data.data);
+            break;
+        case 'team_name_update':
+            console.log('🏀 Team name update received:', data.data);
+            updateTeamNameDisplay(data.data);
+            break;
+        case 'player_name_update':
+            console.log('👤 Player name update received:', data.data);
+            updatePlayerNameDisplay(data.data);
+            break;
+        case 'clock_update':
+        case 'clock_sync':
+            if (String(data.data.game_id) === String(gameId)) {
+                setClockState(data.data);
+            }
+            break;
+        case 'leaders_update':
+            if (data.data.scope === 'game' && String(data.data.game_id) === String(gameId)) {
+                updateLeadersDisplay(data.data.leaders);
+            }
+            break;
+        case 'game_ended':
+            console.log('🏁 Game ended:', data.data);
+            if (String(data.data.game_id) === String(gameId)) {
+                // The server has already started the next game; spread the
+                // reloads out so spectators don't all hit it at once
+                setTimeout(() => location.reload(), Math.random() * 5000);
+            }
+            break;
+        case 'heartbeat':
+            // Keep connection alive - don't log to avoid spam
+            break;
+        case 'shutdown':
+        case 'busy':
+            // Server asked us to come back later; EventSource reconnects using the retry hint
+            console.log('🔁 Server asked to reconnect:', data.type);
+            updateConnectionStatus('disconnected');
+            break;
+        default:
+            console.log('❓ Unknown update type:', data.type, data);
+    }
+}
+
+function updateStatDisplay(data) {
+    // Update the stat button display
+    const statButton = document.querySelector(`button[data-team="${data.team}"][data-player="${data.player_index}"][data-stat="${data.stat_type}"]`);
+    if (statButton) {
+        const statCount = statButton.querySelector('.stat-count');
+        if (statCount) {
+            statCount.textContent = data.value;
+            // Add flash effect
+            statButton.classList.add('update-flash');
+            setTimeout(() => statButton.classList.remove('update-flash'), 500);
+        }
+    }
+
+    // Update total points for the player
+    const totalPointsElement = document.getElementById(`${data.team}-player-${data.player_index}-points`);
+    if (totalPointsElement) {
+        totalPointsElement.textContent = data.total_points;
+        totalPointsElement.classList.add('update-flash');
+        setTimeout(() => totalPointsElement.classList.remove('update-flash'), 500);
+    }
+
+    // Update team scores
+    if (data.team_totals) {
+        const team1Score = document.getElementById('team1-score');
+        const team2Score = document.getElementById('team2-score');
+        if (team1Score) {
+            team1Score.textContent = data.team_totals.team1;
+            team1Score.classList.add('update-flash');
+            setTimeout(() => team1Score.classList.remove('update-flash'), 500);
+        }
+        if (team2Score) {
+            team2Score.textContent = data.team_totals.team2;
+            team2Score.classList.add('update-flash');
+            setTimeout(() => team2Score.classList.remove('update-flash'), 500);
+        }
+    }
+}
+
+// Game clock: server sends transitions and periodic syncs, we count down locally in between
+const clockElement = document.getElementById('game-clock');
+let clockState = {
+    period: parseInt(clockElement.dataset.period),
+    remaining: parseFloat(clockElement.dataset.remaining),
+    running: clockElement.dataset.running === 'true',
+    receivedAt: performance.now()
+};
+
+function setClockState(data) {
+    clockState = {
+        period: data.period,
+        remaining: data.remaining_s,
+        running: data.running,
+        receivedAt: performance.now()
+    };
+    renderClock();
+}
+
+function renderClock() {
+    let remaining = clockState.remaining;
+    if (clockState.running) {
+        remaining = Math.max(0, remaining - (performance.now() - clockState.receivedAt) / 1000);
+    }
+    const minutes = Math.floor(remaining / 60);
+    const seconds = Math.floor(remaining % 60).toString().padStart(2, '0');
+    clockElement.textContent = `Q${clockState.period} ${minutes}:${seconds}`;
+}
+
+setInterval(renderClock, 250);
+renderClock();
+
+function updateClock(action) {
+    if (!gameId) {
+        return;
+    }
+    sendMutation('/update_clock', 'clock', { game_id: gameId, action: action })
+    .then(data => {
+        if (data.clock) {
+            setClockState(data.clock);
+        }
+        if (!data.success) {
+            console.error('Clock update failed:', data.error);
+        }
+    })
+    .catch(error => {
+        console.error('Error updating clock:', error);
+    });
+}
+
+function updateLeadersDisplay(leaders) {
+    Object.keys(leaders).forEach(stat => {
+        const list = document.getElementById(`leaders-${stat}`);
+        if (!list) {
+            return;
+        }
+        list.innerHTML = '';
+        leaders[stat].forEach(leader => {
+            const item = document.createElement('li');
+            item.textContent = `${leader.name} — ${leader.value}`;
+            list.appendChild(item);
+        });
+    });
+}
+
+function updateTeamNameDisplay(data) {
+    // Update all team name inputs
+    if (data.team === 'team1') {
+        const team1Name = document.getElementById('team1-name');
+        const team1HeaderName = document.getElementById('team1-header-name');
+        if (team1Name && team1Name.value !== data.name) team1Name.value = data.name;
+        if (team1HeaderName && team1HeaderName.value !== data.name) team1HeaderName.value = data.name;
+    } else {
+        const team2Name = document.getElementById('team2-name');
+        const team2HeaderName = document.getElementById('team2-header-name');
+        if (team2Name && team2Name.value !== data.name) team2Name.value = data.name;
+        if (team2HeaderName && team2HeaderName.value !== data.name) team2HeaderName.value = data.name;
+    }
+}
+
+function updatePlayerNameDisplay(data) {
+    // Update player name input
+    const playerNameInput = document.querySelector(`input[data-team="${data.team}"][data-player="${data.player_index}"].player-name-input`);
+    if (playerNameInput && playerNameInput.value !== data.name) {
+        playerNameInput.value = data.name;
+    }
+}
+
+function handleStatClick(button) {
+    const buttonId = `${button.dataset.team}-${button.dataset.player}-${button.dataset.stat}`;
+
+    if (clickTimers[buttonId]) {
+        // This is a double click - decrement
+        clearTimeout(clickTimers[buttonId]);
+        delete clickTimers[buttonId];
+        decrementStat(button);
+    } else {
+        // This might be a single click - wait to see if another click comes
+        clickTimers[buttonId] = setTimeout(() => {
+            // Single click confirmed - increment
+            delete clickTimers[buttonId];
+            incrementStat(button);
+        }, 300); // Wait 300ms to see if double click occurs
+    }
+}
+
+function incrementStat(button) {
+    const team = button.dataset.team;
+    const playerIndex = parseInt(button.dataset.player);
+    const statType = button.dataset.stat;
+
+    // Get current count and increment
+    const countSpan = button.querySelector('.stat-count');
+    const currentValue = parseInt(countSpan.textContent) || 0;
+    const newValue = currentValue + 1;
+
+    // Update the display immediately for instant feedback
+    countSpan.textContent = newValue;
+
+    // Add a quick visual feedback
+    button.style.transform = 'scale(1.1)';
+    setTimeout(() => {
+        button.style.transform = '';
+    }, 150);
+
+    sendMutation('/update_player_stat', 'stat', {
+        team: team,
+        player_index: playerIndex,
+        stat_type: statType,
+        value: newValue,
+        game_id: gameId
+    })
+    .then(data => {
+        if (data.success) {
+            // Update player's total points
+            document.getElementById(`${team}-player-${playerIndex}-points`).textContent = data.total_points;
+
+            // Update team scores
+            document.getElementById('team1-score').textContent = data.team_totals.team1;
+            document.getElementById('team2-score').textContent = data.team_totals.team2;
+        } else {
+            // Refused (e.g. rate limited): undo the optimistic count
+            console.error('Stat update refused:', data.error, data.retry_after ? `retry in ${data.retry_after}s` : '');
+            countSpan.textContent = currentValue;
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        // Revert the count if there was an error
+        countSpan.textContent = currentValue;
+    });
+}
+
+function decrementStat(button) {
+    const team = button.dataset.team;
+    const playerIndex = parseInt(button.dataset.player);
+    const statType = button.dataset.stat;
+
+    // Get current count and decrement (but don't go below 0)
+    const countSpan = button.querySelector('.stat-count');
+    const currentValue = parseInt(countSpan.textContent) || 0;
+    const newValue = Math.max(0, currentValue - 1);
+
+    // Update the display immediately for instant feedback
+    countSpan.textContent = newValue;
+
+    // Add a quick visual feedback (different from increment)
+    button.style.transform = 'scale(0.95)';
+    setTimeout(() => {
+        button.style.transform = '';
+    }, 150);
+
+    sendMutation('/update_player_stat', 'stat', {
+        team: team,
+        player_index: playerIndex,
+        stat_type: statType,
+        value: newValue,
+        game_id: gameId
+    })
+    .then(data => {
+        if (data.success) {
+            // Update player's total points
+            document.getElementById(`${team}-player-${playerIndex}-points`).textContent = data.total_points;
+
+            // Update team scores
+            document.getElementById('team1-score').textContent = data.team_totals.team1;
+            document.getElementById('team2-score').textContent = data.team_totals.team2;
+        } else {
+            // Refused (e.g. rate limited): undo the optimistic count
+            console.error('Stat update refused:', data.error, data.retry_after ? `retry in ${data.retry_after}s` : '');
+            countSpan.textContent = currentValue;
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        // Revert the count if there was an error
+        countSpan.textContent = currentValue;
+    });
+}
+
+function resetGame() {
+    if (confirm('Are you sure you want to reset the game? All stats will be lost.')) {
+        location.reload();
+    }
+}
+
+function endGame() {
+    if (!gameId || !confirm('End this game? It will be moved to the archive and a new game started.')) {
+        return;
+    }
+
+    fetch('/end_game', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ game_id: gameId })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        } else {
+            console.error('Failed to end game:', data.error);
+        }
+    })
+    .catch(error => {
+        console.error('Error ending game:', error);
+    });
+}
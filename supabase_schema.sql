@@ -7,9 +7,42 @@ CREATE TABLE IF NOT EXISTS live_games (
     team2_name TEXT NOT NULL DEFAULT 'TEAM 2',
     team1_data JSONB NOT NULL,
     team2_data JSONB NOT NULL,
-    status TEXT NOT NULL DEFAULT 'active',
+    status TEXT NOT NULL DEFAULT 'active',  -- 'active' -> 'finished' -> archived (row removed)
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    ended_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Databases created before games could be ended lack this column
+ALTER TABLE live_games ADD COLUMN IF NOT EXISTS ended_at TIMESTAMP WITH TIME ZONE;
+
+-- Game clock state, so a running clock survives worker restarts
+ALTER TABLE live_games ADD COLUMN IF NOT EXISTS clock_period INTEGER;
+ALTER TABLE live_games ADD COLUMN IF NOT EXISTS clock_remaining_s DOUBLE PRECISION;
+ALTER TABLE live_games ADD COLUMN IF NOT EXISTS clock_running BOOLEAN;
+ALTER TABLE live_games ADD COLUMN IF NOT EXISTS clock_anchor_epoch DOUBLE PRECISION;  -- Unix time of the last transition
+
+-- Live path queries filter on status, so keep them on a narrow index
+CREATE INDEX IF NOT EXISTS live_games_status_created_idx ON live_games (status, created_at DESC);
+
+-- Slim summary rows for archived live games
+CREATE TABLE IF NOT EXISTS game_summaries (
+    game_id BIGINT PRIMARY KEY,
+    team1_name TEXT NOT NULL,
+    team2_name TEXT NOT NULL,
+    team1_score INTEGER NOT NULL,
+    team2_score INTEGER NOT NULL,
+    played_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    ended_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS game_summaries_played_idx ON game_summaries (played_at DESC);
+
+-- Cold storage for archived box scores, only read on demand
+CREATE TABLE IF NOT EXISTS game_box_scores (
+    game_id BIGINT PRIMARY KEY REFERENCES game_summaries (game_id),
+    team1_data JSONB NOT NULL,
+    team2_data JSONB NOT NULL
 );
 
 -- Create the basketball_games table for completed games
@@ -38,15 +71,26 @@ CREATE TABLE IF NOT EXISTS sports_buddies (
     age INTEGER NOT NULL,
     sport TEXT NOT NULL,
     location TEXT NOT NULL,
+    latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION,
     availability TEXT NOT NULL,
     skill_level TEXT NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Databases created before the nearby search lack the coordinate columns
+ALTER TABLE sports_buddies ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE sports_buddies ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+
+-- Index buddy coordinates for bounding-box lookups
+CREATE INDEX IF NOT EXISTS sports_buddies_location_idx ON sports_buddies (latitude, longitude);
+
 -- Enable Row Level Security (RLS)
 ALTER TABLE live_games ENABLE ROW LEVEL SECURITY;
 ALTER TABLE basketball_games ENABLE ROW LEVEL SECURITY;
 ALTER TABLE sports_buddies ENABLE ROW LEVEL SECURITY;
+ALTER TABLE game_summaries ENABLE ROW LEVEL SECURITY;
+ALTER TABLE game_box_scores ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for public read/write access (for demo purposes)
 -- In production, you'd want more restrictive policies
@@ -61,6 +105,22 @@ CREATE POLICY "Allow public insert access to live_games" ON live_games
 CREATE POLICY "Allow public update access to live_games" ON live_games
     FOR UPDATE USING (true);
 
+CREATE POLICY "Allow public delete access to live_games" ON live_games
+    FOR DELETE USING (true);
+
+-- Archive policies
+CREATE POLICY "Allow public read access to game_summaries" ON game_summaries
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow public write access to game_summaries" ON game_summaries
+    FOR ALL USING (true) WITH CHECK (true);
+
+CREATE POLICY "Allow public read access to game_box_scores" ON game_box_scores
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow public write access to game_box_scores" ON game_box_scores
+    FOR ALL USING (true) WITH CHECK (true);
+
 -- Basketball games policies
 CREATE POLICY "Allow public read access to basketball_games" ON basketball_games
     FOR SELECT USING (true);
@@ -76,10 +136,10 @@ CREATE POLICY "Allow public insert access to sports_buddies" ON sports_buddies
     FOR INSERT WITH CHECK (true);
 
 -- Insert some sample data
-INSERT INTO sports_buddies (name, age, sport, location, availability, skill_level) VALUES
-    ('Alex', 12, 'basketball', 'Central Park', 'Weekends', 'intermediate'),
-    ('Sam', 10, 'soccer', 'Riverside Fields', 'After school', 'beginner'),
-    ('Jordan', 11, 'tennis', 'Community Center', 'Weekdays', 'advanced')
+INSERT INTO sports_buddies (name, age, sport, location, latitude, longitude, availability, skill_level) VALUES
+    ('Alex', 12, 'basketball', 'Central Park', 40.7829, -73.9654, 'Weekends', 'intermediate'),
+    ('Sam', 10, 'soccer', 'Riverside Fields', 40.8010, -73.9720, 'After school', 'beginner'),
+    ('Jordan', 11, 'tennis', 'Community Center', 40.7580, -73.9855, 'Weekdays', 'advanced')
 ON CONFLICT DO NOTHING;
 
 -- Create a function to update the updated_at timestamp